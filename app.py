@@ -1,30 +1,168 @@
 import os
-import json
-import csv
+import codecs
+import hashlib
+import secrets
 import threading
 import time
 import logging
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from flask import Flask, render_template, request, redirect, jsonify, send_file
 from werkzeug.utils import secure_filename
-from json_to_csv_converter import combine_json_to_csv, standardize_record, STANDARD_HEADERS
+from json_to_csv_converter import combine_json_to_csv, STANDARD_HEADERS
+from upload_parser import parse_one, encode_csv_rows
+
+# orjson serializes the status responses much faster than the stdlib encoder;
+# fall back to jsonify if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Per-record logging is only built when debug output is enabled
+DEBUG_ENABLED = logger.isEnabledFor(logging.DEBUG)
+
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['OUTPUT_FOLDER'] = 'outputs'
 app.config['MAX_CONTENT_LENGTH'] = 500 * 1024 * 1024  # 500MB max upload size
 app.config['MAX_WORKERS'] = 8  # Number of parallel workers
-app.config['BATCH_SIZE'] = 10000  # Records per batch
+app.config['TASK_TTL'] = 3600  # Seconds to keep finished tasks around
+app.config['MAX_TASKS'] = 1024  # Maximum number of tasks kept in memory
+
+# Offload downloads to the reverse proxy when it supports it
+app.config['USE_X_SENDFILE'] = os.environ.get('USE_X_SENDFILE') == '1'  # Apache/lighttpd
+app.config['X_ACCEL_REDIRECT_PREFIX'] = os.environ.get('X_ACCEL_REDIRECT_PREFIX', '')  # nginx internal location
 
 # Create necessary directories if they don't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
 
-# Global dictionary to store conversion tasks and their progress
-conversion_tasks = {}
+# Conversion tasks and their progress, oldest first. Every access goes
+# through tasks_lock since the request and worker threads both update it.
+conversion_tasks = OrderedDict()
+tasks_lock = threading.Lock()
+
+# A single janitor thread handles cleanup for every task. It is started with
+# the first task rather than on import, so processes that merely import this
+# module (such as parsing workers re-importing `python app.py`) don't run one.
+cleanup_thread = None
+
+def add_task(task_id, task):
+    """Register a new task, evicting the oldest ones beyond MAX_TASKS."""
+    global cleanup_thread
+    with tasks_lock:
+        if cleanup_thread is None:
+            cleanup_thread = threading.Thread(target=cleanup_tasks, daemon=True)
+            cleanup_thread.start()
+        conversion_tasks[task_id] = task
+        while len(conversion_tasks) > app.config['MAX_TASKS']:
+            conversion_tasks.popitem(last=False)
+
+def update_task(task_id, **changes):
+    """Apply changes to a task's fields in a single locked update."""
+    with tasks_lock:
+        task = conversion_tasks.get(task_id)
+        if task is not None:
+            task.update(changes)
+
+def get_task(task_id):
+    """Return a consistent copy of a task, or None if it doesn't exist."""
+    with tasks_lock:
+        task = conversion_tasks.get(task_id)
+        return dict(task) if task is not None else None
+
+# Bounded pool that runs the conversions, so concurrent uploads can't spawn
+# an unbounded number of threads
+conversion_executor = ThreadPoolExecutor(max_workers=app.config['MAX_WORKERS'])
+
+# Worker processes that parse the uploads, shared by every conversion and
+# created on first use. The workers come from a forkserver (or are spawned
+# where there is none) rather than being forked from this multi-threaded
+# process, where a child could inherit a lock another thread was holding.
+parse_pool = None
+parse_pool_lock = threading.Lock()
+
+def get_parse_pool():
+    """Return the shared parsing pool, starting it if needed."""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is None:
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            parse_pool = ProcessPoolExecutor(max_workers=app.config['MAX_WORKERS'],
+                                             mp_context=multiprocessing.get_context(start_method))
+        return parse_pool
+
+def discard_parse_pool(pool):
+    """Drop a broken parsing pool so the next conversion starts a new one."""
+    global parse_pool
+    with parse_pool_lock:
+        if parse_pool is pool:
+            parse_pool = None
+    pool.shutdown(wait=False)
+
+def cleanup_tasks():
+    """Periodically remove finished tasks older than TASK_TTL seconds."""
+    while True:
+        time.sleep(60)
+        cutoff = time.time() - app.config['TASK_TTL']
+        with tasks_lock:
+            for task_id, task in list(conversion_tasks.items()):
+                if task['status'] in ('completed', 'error') and task['created_at'] < cutoff:
+                    del conversion_tasks[task_id]
+
+def file_digest(file_path):
+    """Return a BLAKE2 digest of a file's contents, used to spot duplicate uploads."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.digest()
+
+def json_response(data):
+    """
+    Build a JSON response, serializing with orjson when it is available.
+
+    Used by the status endpoint, which the UI polls throughout a conversion.
+    """
+    if orjson is not None:
+        return app.response_class(orjson.dumps(data), mimetype='application/json')
+    return jsonify(data)
+
+def send_csv(file_path, download_name):
+    """
+    Send a CSV file as an Excel-friendly attachment.
+
+    When the app sits behind nginx with X_ACCEL_REDIRECT_PREFIX set, or behind
+    a server supporting X-Sendfile with USE_X_SENDFILE on, the proxy streams
+    the file itself and the worker is freed immediately.
+    """
+    accel_prefix = app.config['X_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(file_path)
+        response = app.response_class(mimetype='text/csv')
+        response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{os.path.basename(file_path)}"
+    else:
+        # send_file hands the path to the server instead when USE_X_SENDFILE is on
+        response = send_file(
+            file_path,
+            mimetype='text/csv',
+            as_attachment=True,
+            download_name=download_name
+        )
+
+    # Add headers to ensure Excel opens the file correctly
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+
+    return response
 
 @app.route('/')
 def index():
@@ -35,19 +173,7 @@ def test_download():
     """Download a test CSV file with all headers"""
     test_file = os.path.join(app.config['OUTPUT_FOLDER'], 'test_excel.csv')
 
-    # Use Flask's send_file function with Excel-compatible settings
-    response = send_file(
-        test_file,
-        mimetype='text/csv',
-        as_attachment=True,
-        download_name='test_excel.csv'
-    )
-
-    # Add headers to ensure Excel opens the file correctly
-    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-    response.headers['Content-Disposition'] = 'attachment; filename="test_excel.csv"'
-
-    return response
+    return send_csv(test_file, 'test_excel.csv')
 
 @app.route('/convert', methods=['POST'])
 def convert():
@@ -72,53 +198,51 @@ def convert():
     # Add .csv extension
     output_filename = f"{base_name}.csv"
 
-    # Generate a unique task ID
-    task_id = str(int(time.time()))
+    # Keep only the JSON uploads (case-insensitively) along with their safe names
+    upload_dir = app.config['UPLOAD_FOLDER']
+    json_uploads = [(file, secure_filename(file.filename)) for file in files
+                    if file and file.filename.lower().endswith('.json')]
+
+    # Generate a unique task ID; random so concurrent uploads can't collide
+    task_id = secrets.token_hex(8)
 
     # Initialize task status
-    conversion_tasks[task_id] = {
+    add_task(task_id, {
         'status': 'uploading',
         'progress': 0,
-        'total': len(files),
+        'total': len(json_uploads),
         'message': 'Uploading files...',
         'output_file': output_filename,
         'stats': None,
-        'error': None
-    }
+        'error': None,
+        'created_at': time.time()
+    })
 
     # Save uploaded files
     saved_files = []
-    for i, file in enumerate(files):
-        if file and file.filename.endswith('.json'):
-            try:
-                # Read the file content
-                file_content = file.read()
-
-                # Log file info
-                logger.info(f"Uploaded file: {file.filename}, size: {len(file_content)} bytes")
-                preview_text = file_content[:100].decode('utf-8', errors='ignore')
+    for i, (file, filename) in enumerate(json_uploads):
+        try:
+            # Stream the upload straight to disk in 1MB chunks
+            filepath = os.path.join(upload_dir, filename)
+            file.save(filepath, buffer_size=1 << 20)
+
+            # Log file info
+            logger.info(f"Uploaded file: {file.filename}, size: {os.path.getsize(filepath)} bytes")
+            if DEBUG_ENABLED:
+                with open(filepath, 'rb') as f:
+                    preview_text = f.read(100).decode('utf-8', errors='ignore')
                 preview_text = preview_text.replace('\n', ' ')
-                logger.info(f"Preview: {preview_text}...")
-
-                # Save the file
-                filename = secure_filename(file.filename)
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-
-                # Write the content to the file
-                with open(filepath, 'wb') as f:
-                    f.write(file_content)
+                logger.debug(f"Preview: {preview_text}...")
 
-                saved_files.append(filepath)
+            saved_files.append(filepath)
 
-                # Update progress
-                conversion_tasks[task_id]['progress'] = i + 1
-                conversion_tasks[task_id]['message'] = f"Uploaded {i+1} of {len(files)} files"
-            except Exception as e:
-                logger.error(f"Error saving file {file.filename}: {str(e)}")
+            # Update progress
+            update_task(task_id, progress=i + 1, message=f"Uploaded {i+1} of {len(json_uploads)} files")
+        except Exception as e:
+            logger.error(f"Error saving file {file.filename}: {str(e)}")
 
     if not saved_files:
-        conversion_tasks[task_id]['status'] = 'error'
-        conversion_tasks[task_id]['error'] = "No valid JSON files uploaded"
+        update_task(task_id, status='error', error="No valid JSON files uploaded")
         return jsonify({
             'status': 'error',
             'message': "No valid JSON files uploaded",
@@ -129,12 +253,11 @@ def convert():
     output_path = os.path.join(app.config['OUTPUT_FOLDER'], output_filename)
 
     # Update task status
-    conversion_tasks[task_id]['status'] = 'processing'
-    conversion_tasks[task_id]['progress'] = 0
-    conversion_tasks[task_id]['total'] = len(saved_files)
-    conversion_tasks[task_id]['message'] = 'Starting conversion...'
+    update_task(task_id, status='processing', progress=0, total=len(saved_files),
+                message='Starting conversion...')
 
-    # Skip duplicates setting is no longer used with direct processing
+    # Skip re-processing uploads whose contents were already seen in this task
+    skip_duplicates = request.form.get('skip_duplicates') == 'true'
 
     # Start conversion in a separate thread
     def run_conversion():
@@ -146,198 +269,71 @@ def convert():
             if len(saved_files) > 5:
                 logger.info(f"  ... and {len(saved_files) - 5} more files")
 
-            # Direct processing for all files
-            # Note: We're already importing standardize_record and STANDARD_HEADERS at the top of the file
-
-            # Create CSV file
-            with open(output_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=STANDARD_HEADERS)
-                writer.writeheader()
-
-                # Process each file directly
-                records_processed = 0
-                files_processed = 0
-                files_with_errors = 0
-                errors = []
-
-                for file_path in saved_files:
+            records_processed = 0
+            files_processed = 0
+            files_with_errors = 0
+            duplicates_skipped = 0
+            errors = []
+
+            def unique_files(reader_pool):
+                """
+                Yield the uploads whose contents haven't been seen yet.
+
+                Identical files would only produce identical rows, so they are
+                dropped by content hash before being parsed. The hashing runs on
+                reader_pool, overlapping the disk reads with the parsing of the
+                files already handed to the worker processes.
+                """
+                nonlocal duplicates_skipped
+                seen_digests = set()
+                digests = reader_pool.map(file_digest, saved_files)
+                for file_path, digest in zip(saved_files, digests):
+                    if digest in seen_digests:
+                        duplicates_skipped += 1
+                        continue
+                    seen_digests.add(digest)
+                    yield file_path
+
+            # Create CSV file behind a 1MB write buffer. Excel needs the UTF-8
+            # BOM, so it goes first, followed by the header row.
+            with open(output_path, 'wb', buffering=1 << 20) as csvfile:
+                csvfile.write(codecs.BOM_UTF8)
+                csvfile.write(encode_csv_rows([STANDARD_HEADERS]))
+
+                # Parse, standardize and serialize the files across worker
+                # processes; this thread only appends each file's CSV bytes
+                with ThreadPoolExecutor(max_workers=4) as reader_pool:
+                    executor = get_parse_pool()
+                    files_to_parse = unique_files(reader_pool) if skip_duplicates else saved_files
                     try:
-                        logger.info(f"Processing file: {os.path.basename(file_path)}")
-
-                        # Load the file
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            json_data = json.load(f)
-
-                        # Check if this is a product file
-                        if 'product' in json_data and isinstance(json_data['product'], dict):
-                            product = json_data['product']
-
-                            # Check for buybox_winner at top level
-                            if 'buybox_winner' in json_data and isinstance(json_data['buybox_winner'], dict):
-                                logger.info("Found buybox_winner at top level")
-                                if 'price' in json_data['buybox_winner']:
-                                    logger.info(f"Found price: {json_data['buybox_winner']['price']}")
-                                    # Add the price to the product for standardization
-                                    product['buybox_winner'] = json_data['buybox_winner']
-
-                            # Check for description
-                            if 'description' in product and product['description']:
-                                logger.info(f"Found description in product: {product['description'][:50]}...")
-                            else:
-                                logger.warning("No description found in product")
-                                # Try to find description in other places
-                                if 'description_full' in product:
-                                    logger.info("Using description_full instead")
-                                    product['description'] = product['description_full']
-                                elif 'long_description' in product:
-                                    logger.info("Using long_description instead")
-                                    product['description'] = product['long_description']
-                                elif 'details' in product:
-                                    logger.info("Using details instead")
-                                    product['description'] = product['details']
-                                # Use title as description if no description is found
-                                elif 'title' in product:
-                                    logger.info(f"Using title as description: {product['title']}")
-                                    product['description'] = product['title']
-
-                            # Standardize the record
-                            standardized = standardize_record(product)
-
-                        # Check if this is a search results file
-                        elif 'search_results' in json_data:
-                            logger.info("Found search_results structure")
-                            search_results = json_data['search_results']
-
-                            # Handle different search results structures
-                            products = []
-
-                            # Check for products array in search_results
-                            if isinstance(search_results, dict) and 'products' in search_results and isinstance(search_results['products'], list):
-                                logger.info(f"Found {len(search_results['products'])} products in search_results.products")
-                                products = search_results['products']
-                            # Check if search_results is itself an array of products
-                            elif isinstance(search_results, list):
-                                logger.info(f"Found {len(search_results)} products in search_results array")
-                                products = search_results
-
-                            # Process each product
-                            if products:
-                                for product in products:
-                                    if isinstance(product, dict):
-                                        # Check if this is a product with data
-                                        if 'product' in product and isinstance(product['product'], dict):
-                                            product_data = product['product']
-
-                                            # Check for price in offers
-                                            if 'offers' in product and isinstance(product['offers'], dict):
-                                                if 'primary' in product['offers'] and isinstance(product['offers']['primary'], dict):
-                                                    if 'price' in product['offers']['primary']:
-                                                        price = product['offers']['primary']['price']
-                                                        logger.info(f"Found price in offers.primary: {price}")
-                                                        product_data['price'] = price
-
-                                            # Check for description
-                                            if 'description' in product and product['description']:
-                                                logger.info(f"Found description in product: {product['description'][:50]}...")
-                                                product_data['description'] = product['description']
-
-                                            # Check for snippet
-                                            if 'snippet' in product and product['snippet']:
-                                                logger.info(f"Found snippet in product: {product['snippet'][:50]}...")
-                                                if 'description' not in product_data or not product_data['description']:
-                                                    product_data['description'] = product['snippet']
-
-                                            # Check for content_spec
-                                            if 'content_spec' in product and isinstance(product['content_spec'], dict):
-                                                if 'description' in product['content_spec'] and product['content_spec']['description']:
-                                                    logger.info(f"Found description in content_spec: {product['content_spec']['description'][:50]}...")
-                                                    if 'description' not in product_data or not product_data['description']:
-                                                        product_data['description'] = product['content_spec']['description']
-
-                                            # Check for specifications
-                                            if 'specifications' in product and isinstance(product['specifications'], list):
-                                                for spec in product['specifications']:
-                                                    if isinstance(spec, dict) and 'key' in spec and 'value' in spec:
-                                                        if spec['key'] == 'Description' and spec['value']:
-                                                            logger.info(f"Found description in specifications: {spec['value'][:50]}...")
-                                                            if 'description' not in product_data or not product_data['description']:
-                                                                product_data['description'] = spec['value']
-
-                                            # Use title as description if no description is found
-                                            if ('description' not in product_data or not product_data['description']) and 'title' in product_data:
-                                                logger.info(f"Using title as description: {product_data['title']}")
-                                                product_data['description'] = product_data['title']
-
-                                            # Standardize the record
-                                            standardized = standardize_record(product_data)
-
-                                            # Log the standardized record
-                                            logger.info(f"Standardized record from search results: {standardized}")
-
-                                            # Check if the record has any data
-                                            has_data = False
-                                            for key, value in standardized.items():
-                                                if value and key not in ['Source', 'Purchase Account', 'Vendor', 'CF.Markup', 'CF.Supplier']:
-                                                    has_data = True
-                                                    break
-
-                                            if has_data:
-                                                # Write to CSV
-                                                writer.writerow(standardized)
-                                                records_processed += 1
-                                                logger.info(f"Record written to CSV from search results")
-
-                                                # Log the result
-                                                if standardized.get('Rate'):
-                                                    logger.info(f"Extracted price: {standardized['Rate']}")
-                                                else:
-                                                    logger.warning(f"No price extracted for product in search results")
-                                            else:
-                                                logger.warning(f"Record from search results has no meaningful data, skipping")
-                                continue  # Skip the rest of the processing for this file since we've handled the search results
-
-                        # For product files, continue with the existing logic
-                        if 'product' in json_data and isinstance(json_data['product'], dict):
-                            # Log the standardized record
-                            logger.info(f"Standardized record: {standardized}")
-
-                            # Check if the record has any data
-                            has_data = False
-                            for key, value in standardized.items():
-                                if value and key not in ['Source', 'Purchase Account', 'Vendor', 'CF.Markup', 'CF.Supplier']:
-                                    has_data = True
-                                    break
-
-                            if has_data:
-                                # Write to CSV
-                                writer.writerow(standardized)
-                                records_processed += 1
-                                logger.info(f"Record written to CSV")
-
-                                # Log the result
-                                if standardized.get('Rate'):
-                                    logger.info(f"Extracted price: {standardized['Rate']}")
-                                else:
-                                    logger.warning(f"No price extracted for {os.path.basename(file_path)}")
+                        # Send the files in chunks to cut the per-file IPC overhead,
+                        # small enough that every worker gets a share
+                        chunksize = max(1, len(saved_files) // (app.config['MAX_WORKERS'] * 4))
+                        results = executor.map(parse_one, files_to_parse, chunksize=chunksize)
+                        for files_parsed, (chunk, record_count, file_errors) in enumerate(results, 1):
+                            if chunk is None:
+                                files_with_errors += 1
                             else:
-                                logger.warning(f"Record has no meaningful data, skipping: {os.path.basename(file_path)}")
-                        else:
-                            logger.warning(f"No product data found in {os.path.basename(file_path)}")
-                            errors.append(f"No product data found in {os.path.basename(file_path)}")
-                            files_with_errors += 1
-
-                        files_processed += 1
-                    except Exception as e:
-                        logger.error(f"Error processing {os.path.basename(file_path)}: {str(e)}")
-                        errors.append(f"Error processing {os.path.basename(file_path)}: {str(e)}")
-                        files_with_errors += 1
+                                files_processed += 1
+                                if file_errors:
+                                    files_with_errors += 1
+
+                                csvfile.write(chunk)
+                                records_processed += record_count
+
+                            errors.extend(file_errors)
+                            update_task(task_id, progress=files_parsed + duplicates_skipped)
+                    except BrokenProcessPool:
+                        # A worker died; this conversion fails, later ones get a new pool
+                        discard_parse_pool(executor)
+                        raise
 
                 # Create stats
                 stats = {
                     "files_processed": files_processed,
                     "files_with_errors": files_with_errors,
                     "records_processed": records_processed,
-                    "duplicates_skipped": 0,
+                    "duplicates_skipped": duplicates_skipped,
                     "errors": errors,
                     "elapsed_time": 0
                 }
@@ -349,30 +345,14 @@ def convert():
             logger.info(f"Conversion results: {stats['records_processed']} records processed, {stats['duplicates_skipped']} duplicates skipped")
 
             # Update task status
-            conversion_tasks[task_id]['status'] = 'completed'
-            conversion_tasks[task_id]['message'] = 'Conversion complete'
-            conversion_tasks[task_id]['stats'] = stats
-
-            # Clean up old tasks after 1 hour
-            def cleanup():
-                time.sleep(3600)  # 1 hour
-                if task_id in conversion_tasks:
-                    del conversion_tasks[task_id]
-
-            cleanup_thread = threading.Thread(target=cleanup)
-            cleanup_thread.daemon = True
-            cleanup_thread.start()
+            update_task(task_id, status='completed', message='Conversion complete', stats=stats)
 
         except Exception as e:
             logger.error(f"Error during conversion: {str(e)}")
-            conversion_tasks[task_id]['status'] = 'error'
-            conversion_tasks[task_id]['error'] = str(e)
-            conversion_tasks[task_id]['message'] = f"Error: {str(e)}"
+            update_task(task_id, status='error', error=str(e), message=f"Error: {str(e)}")
 
-    # Start the conversion thread
-    conversion_thread = threading.Thread(target=run_conversion)
-    conversion_thread.daemon = True
-    conversion_thread.start()
+    # Queue the conversion on the shared executor
+    conversion_executor.submit(run_conversion)
 
     # Return task ID for status polling
     return jsonify({
@@ -384,25 +364,25 @@ def convert():
 @app.route('/status/<task_id>', methods=['GET'])
 def get_status(task_id):
     """Get the status of a conversion task"""
-    if task_id not in conversion_tasks:
+    task = get_task(task_id)
+    if task is None:
         return jsonify({
             'status': 'error',
             'message': 'Task not found'
         }), 404
 
-    return jsonify(conversion_tasks[task_id])
+    return json_response(task)
 
 @app.route('/download/<task_id>', methods=['GET'])
 def download_file(task_id):
     """Download the converted CSV file"""
-    if task_id not in conversion_tasks:
+    task = get_task(task_id)
+    if task is None:
         return jsonify({
             'status': 'error',
             'message': 'Task not found'
         }), 404
 
-    task = conversion_tasks[task_id]
-
     if task['status'] != 'completed':
         return jsonify({
             'status': 'error',
@@ -412,20 +392,7 @@ def download_file(task_id):
     output_path = os.path.join(app.config['OUTPUT_FOLDER'], task['output_file'])
 
     try:
-        # Use Flask's send_file function with Excel-compatible settings
-        # This ensures proper handling of the file content and headers
-        response = send_file(
-            output_path,
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=task['output_file']
-        )
-
-        # Add headers to ensure Excel opens the file correctly
-        response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-        response.headers['Content-Disposition'] = f'attachment; filename="{task["output_file"]}"'
-
-        return response
+        return send_csv(output_path, task['output_file'])
     except Exception as e:
         logger.error(f"Error reading output file: {str(e)}")
         return jsonify({
@@ -1,17 +1,51 @@
-import json
+"""
+Convert Home Depot product JSON files into a single CSV with standardized headers.
+
+The per-record code (standardize_record, map_field_name, extract_price) is
+plain dict and string work with no C extensions, so it runs well under PyPy.
+Native JSON parsers are optional: without orjson or ujson the stdlib json
+module is used, which is the fastest choice on PyPy anyway
+(see requirements-pypy.txt).
+"""
 import csv
+import codecs
+import functools
 import glob
+import hashlib
 import os
 import time
 import logging
+import operator
+import queue
 import re
-from typing import List, Dict, Any, Tuple, Callable, Optional, Union
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+from typing import List, Dict, Any, Tuple, Callable, Optional, Set, Union, Iterator, BinaryIO
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+# Use the fastest available JSON parser for reading input files. All three
+# accept bytes and raise a ValueError subclass on malformed input.
+try:
+    import orjson as _json
+except ImportError:
+    try:
+        import ujson as _json
+    except ImportError:
+        import json as _json
+
+# ijson is only needed when STREAM_LARGE_FILES is on (see below)
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Per-record logging is only built when debug output is enabled
+DEBUG_ENABLED = logger.isEnabledFor(logging.DEBUG)
+
 # Standard column headers and their mappings from various possible source fields
 STANDARD_HEADERS = [
     "Item ID",
@@ -36,6 +70,9 @@ STANDARD_HEADERS = [
     "CF.Cost"
 ]
 
+# Standard headers as a set, for membership tests
+_STANDARD_HEADERS_SET = frozenset(STANDARD_HEADERS)
+
 # Mapping of source fields to standard fields
 FIELD_MAPPING = {
     # Item ID mappings
@@ -137,7 +174,9 @@ FIELD_MAPPING = {
     "productMaterial": "CF.Material",
 }
 
-# Function to map source field names to standard field names
+# Function to map source field names to standard field names. The same field
+# names repeat across records, so results are cached per name.
+@functools.lru_cache(maxsize=2048)
 def map_field_name(field_name: str) -> str:
     """Map a source field name to a standard field name."""
     # Convert to lowercase for case-insensitive matching
@@ -148,183 +187,289 @@ def map_field_name(field_name: str) -> str:
         return FIELD_MAPPING[field_lower]
 
     # Try to match based on common patterns
-    for source, target in FIELD_MAPPING.items():
-        # Check if the field contains the source as a substring
-        if source in field_lower:
-            return target
+    target = _substring_field_match(field_lower)
+    if target is not None:
+        return target
 
     # If no mapping found, return the original field name
     return field_name
 
+# All FIELD_MAPPING sources as one pattern, in mapping order. The lookahead
+# reports every (possibly overlapping) match position, so a single scan finds
+# all sources contained in a field name.
+_FIELD_SOURCES = list(FIELD_MAPPING)
+_FIELD_SOURCE_RE = re.compile('(?=(' + '|'.join(map(re.escape, _FIELD_SOURCES)) + '))')
+_FIELD_SOURCE_ORDER = {source: i for i, source in enumerate(_FIELD_SOURCES)}
+
+def _substring_field_match(field_lower: str) -> Optional[str]:
+    """Return the target of the first FIELD_MAPPING source contained in field_lower."""
+    # Of all sources in the field name, the one listed first in FIELD_MAPPING wins
+    matches = [_FIELD_SOURCE_ORDER[m.group(1)] for m in _FIELD_SOURCE_RE.finditer(field_lower)]
+    if not matches:
+        return None
+    return FIELD_MAPPING[_FIELD_SOURCES[min(matches)]]
+
+# Empty standardized record with the default values set, copied for each record
+_TEMPLATE = {header: "" for header in STANDARD_HEADERS}
+_TEMPLATE["Source"] = "HD"
+_TEMPLATE["Purchase Account"] = "HD"
+_TEMPLATE["Vendor"] = "HD"
+_TEMPLATE["CF.Markup"] = "43%"
+_TEMPLATE["CF.Supplier"] = "HD"
+
+# Record keys that standardize_record handles explicitly
+_PROCESSED_FIELDS = frozenset({'identifiers', 'title', 'name', 'description', 'details', 'price', 'brand', 'category', 'categories', 'link', 'url', 'specifications'})
+
+# Cache of field-mapping plans, keyed by a record's key sequence. Records from
+# the same source share a handful of schemas, so this stays small; it is
+# cleared if it ever grows past the limit.
+_PLAN_CACHE: Dict[Tuple[str, ...], Tuple] = {}
+_PLAN_CACHE_SIZE = 1024
+
+def _build_plan(keys: Tuple[str, ...]) -> Tuple:
+    """
+    Work out the field-mapping decisions that depend only on which keys a record has.
+
+    Returns a tuple of:
+    - the key to take Item ID from (or None)
+    - the key to take SKU from (or None)
+    - the key to take Item Name from (or None)
+    - the description candidate keys present, in priority order
+    - the URL candidate keys present, in priority order
+    - (field, standard header) pairs for the remaining mappable fields, in record order
+    """
+    present = set(keys)
+    id_key = next((k for k in ('item_id', 'model_number') if k in present), None)
+    sku_key = next((k for k in ('model_number', 'store_sku') if k in present), None)
+    name_key = next((k for k in ('title', 'name') if k in present), None)
+    desc_keys = tuple(k for k in ('description', 'details', 'title') if k in present)
+    url_keys = tuple(k for k in ('link', 'url') if k in present)
+
+    remaining = []
+    for field in keys:
+        # Skip fields processed explicitly
+        if field in _PROCESSED_FIELDS:
+            continue
+
+        # Only standard headers are kept
+        standard_field = map_field_name(field)
+        if standard_field in _STANDARD_HEADERS_SET:
+            remaining.append((field, standard_field))
+
+    return id_key, sku_key, name_key, desc_keys, url_keys, tuple(remaining)
+
+def _get_plan(record: Dict[str, Any]) -> Tuple:
+    """Fetch the cached plan for a record's key sequence, building it on a miss."""
+    keys = tuple(record)
+    plan = _PLAN_CACHE.get(keys)
+    if plan is None:
+        if len(_PLAN_CACHE) >= _PLAN_CACHE_SIZE:
+            _PLAN_CACHE.clear()
+        plan = _PLAN_CACHE[keys] = _build_plan(keys)
+    return plan
+
 # Function to standardize a data record
-def standardize_record(record: Dict[str, Any]) -> Dict[str, Any]:
-    """Standardize a data record by mapping fields and adding default values."""
-    standardized = {header: "" for header in STANDARD_HEADERS}
+def standardize_record(record: Dict[str, Any], buybox_winner: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Standardize a data record by mapping fields and adding default values.
+
+    If buybox_winner is given, its price is used in place of the record's own
+    buybox_winner, so a file-level buybox winner can be applied to a product
+    without copying the product.
+    """
+    id_key, sku_key, name_key, desc_keys, url_keys, remaining = _get_plan(record)
 
-    # Set default values
-    standardized["Source"] = "HD"
-    standardized["Purchase Account"] = "HD"
-    standardized["Vendor"] = "HD"
-    standardized["CF.Markup"] = "43%"
-    standardized["CF.Supplier"] = "HD"
+    # Start from the empty record with default values set
+    standardized = _TEMPLATE.copy()
 
     # Extract product ID directly from item_id or model_number
-    if 'item_id' in record:
-        standardized["Item ID"] = str(record['item_id'])
-    elif 'model_number' in record:
-        standardized["Item ID"] = str(record['model_number'])
+    if id_key:
+        standardized["Item ID"] = str(record[id_key])
 
     # Extract SKU from model_number or store_sku
-    if 'model_number' in record:
-        standardized["SKU"] = str(record['model_number'])
-    elif 'store_sku' in record:
-        standardized["SKU"] = str(record['store_sku'])
+    if sku_key:
+        standardized["SKU"] = str(record[sku_key])
 
     # Handle Home Depot specific structure for identifiers
-    if 'identifiers' in record and isinstance(record['identifiers'], dict):
+    identifiers = record.get('identifiers')
+    if isinstance(identifiers, dict):
         # Extract product ID if not already set
         if not standardized["Item ID"]:
-            if 'product_id' in record['identifiers']:
-                standardized["Item ID"] = str(record['identifiers']['product_id'])
-            elif 'item_id' in record['identifiers']:
-                standardized["Item ID"] = str(record['identifiers']['item_id'])
+            if 'product_id' in identifiers:
+                standardized["Item ID"] = str(identifiers['product_id'])
+            elif 'item_id' in identifiers:
+                standardized["Item ID"] = str(identifiers['item_id'])
 
         # Extract SKU/model if not already set
         if not standardized["SKU"]:
-            if 'sku' in record['identifiers']:
-                standardized["SKU"] = str(record['identifiers']['sku'])
-            elif 'model_number' in record['identifiers']:
-                standardized["SKU"] = str(record['identifiers']['model_number'])
+            if 'sku' in identifiers:
+                standardized["SKU"] = str(identifiers['sku'])
+            elif 'model_number' in identifiers:
+                standardized["SKU"] = str(identifiers['model_number'])
 
     # Extract product name
-    if 'title' in record:
-        standardized["Item Name"] = str(record['title'])
-    elif 'name' in record:
-        standardized["Item Name"] = str(record['name'])
-
-    # Extract description
-    if 'description' in record and record['description']:
-        standardized["Description"] = str(record['description'])
-        standardized["CF.Description"] = str(record['description'])
-    elif 'details' in record and record['details']:
-        standardized["Description"] = str(record['details'])
-        standardized["CF.Description"] = str(record['details'])
-    # Use title as description if no description is found
-    elif 'title' in record and record['title']:
-        standardized["Description"] = str(record['title'])
-        standardized["CF.Description"] = str(record['title'])
-    elif standardized.get("Item Name"):
-        standardized["Description"] = standardized["Item Name"]
-        standardized["CF.Description"] = standardized["Item Name"]
+    if name_key:
+        standardized["Item Name"] = str(record[name_key])
+
+    # Extract description from description or details, using the title as
+    # the description if neither has a value
+    for key in desc_keys:
+        description = record[key]
+        if description:
+            standardized["Description"] = standardized["CF.Description"] = str(description)
+            break
+    else:
+        if standardized.get("Item Name"):
+            standardized["Description"] = standardized["Item Name"]
+            standardized["CF.Description"] = standardized["Item Name"]
 
     # PRICE EXTRACTION - SIMPLIFIED AND FOCUSED ON KNOWN PATHS
     price_value = None
 
     # Log price extraction attempt
-    logger.info(f"  Price extraction for product: {standardized.get('Item Name', 'Unknown')}")
+    if DEBUG_ENABLED:
+        logger.debug(f"  Price extraction for product: {standardized.get('Item Name', 'Unknown')}")
 
     # Direct approach for product.buybox_winner.price (most common path based on analysis)
-    if 'buybox_winner' in record and isinstance(record['buybox_winner'], dict):
-        if 'price' in record['buybox_winner']:
-            raw_price = record['buybox_winner']['price']
+    if buybox_winner is None:
+        buybox_winner = record.get('buybox_winner')
+    if isinstance(buybox_winner, dict):
+        if 'price' in buybox_winner:
+            raw_price = buybox_winner['price']
             price_value = extract_price(raw_price)
-            logger.info(f"    Found buybox_winner.price: {raw_price} -> {price_value}")
-        else:
-            logger.info(f"    buybox_winner found but no price field")
-    else:
-        logger.info(f"    No buybox_winner field found")
+            if DEBUG_ENABLED:
+                logger.debug(f"    Found buybox_winner.price: {raw_price} -> {price_value}")
+        elif DEBUG_ENABLED:
+            logger.debug("    buybox_winner found but no price field")
+    elif DEBUG_ENABLED:
+        logger.debug("    No buybox_winner field found")
 
     # Fallback to direct price field
     if price_value is None and 'price' in record:
         raw_price = record['price']
         price_value = extract_price(raw_price)
-        logger.info(f"    Found direct price: {raw_price} -> {price_value}")
+        if DEBUG_ENABLED:
+            logger.debug(f"    Found direct price: {raw_price} -> {price_value}")
 
     # Set the price fields if we found a value
     if price_value:
         standardized["Rate"] = price_value
         standardized["Purchase Rate"] = price_value
         standardized["CF.Cost"] = price_value
-        logger.info(f"    Set Rate to: {price_value}")
-    else:
-        logger.info(f"    No price found for this product")
+        if DEBUG_ENABLED:
+            logger.debug(f"    Set Rate to: {price_value}")
+    elif DEBUG_ENABLED:
+        logger.debug("    No price found for this product")
 
     # Extract brand/manufacturer
-    if 'brand' in record and record['brand']:
-        standardized["CF.Manufacturer"] = str(record['brand'])
+    brand = record.get('brand')
+    if brand:
+        standardized["CF.Manufacturer"] = str(brand)
 
     # Extract category
-    if 'category' in record and record['category']:
-        standardized["Item Type"] = str(record['category'])
-    elif 'categories' in record and record['categories'] and isinstance(record['categories'], list) and len(record['categories']) > 0:
-        standardized["Item Type"] = str(record['categories'][0])
+    category = record.get('category')
+    if category:
+        standardized["Item Type"] = str(category)
+    else:
+        categories = record.get('categories')
+        if categories and isinstance(categories, list):
+            standardized["Item Type"] = str(categories[0])
 
     # Extract URL
-    if 'link' in record and record['link']:
-        standardized["CF.URL"] = str(record['link'])
-    elif 'url' in record and record['url']:
-        standardized["CF.URL"] = str(record['url'])
+    for key in url_keys:
+        url = record[key]
+        if url:
+            standardized["CF.URL"] = str(url)
+            break
 
     # Extract material
-    if 'specifications' in record and isinstance(record['specifications'], list):
-        for spec in record['specifications']:
+    specifications = record.get('specifications')
+    if isinstance(specifications, list):
+        for spec in specifications:
             if isinstance(spec, dict) and 'key' in spec and 'value' in spec:
-                if spec['key'].lower() in ['material', 'materials']:
+                if spec['key'].lower() in ('material', 'materials'):
                     standardized["CF.Material"] = str(spec['value'])
 
     # Map any remaining fields from the record
-    for field, value in record.items():
-        # Skip fields we've already processed
-        if field in ['identifiers', 'title', 'name', 'description', 'details', 'price', 'brand', 'category', 'categories', 'link', 'url', 'specifications']:
-            continue
+    for field, standard_field in remaining:
+        # Only add if not already set
+        if not standardized[standard_field]:
+            standardized[standard_field] = str(record[field])
 
-        # Try to map the field to a standard header
-        standard_field = map_field_name(field)
+    return standardized
 
-        # Only add if it's a standard header and not already set
-        if standard_field in STANDARD_HEADERS and not standardized[standard_field]:
-            standardized[standard_field] = str(value)
+# Position of each standard header within a row tuple
+HEADER_INDEX = {header: i for i, header in enumerate(STANDARD_HEADERS)}
 
-    return standardized
+# Pulls a standardized record's values out as a tuple in STANDARD_HEADERS order
+project_row = operator.itemgetter(*STANDARD_HEADERS)
+
+# Function to standardize a data record into a CSV row. Records are standardized
+# one at a time: the mapping rules depend on each value (fallbacks, type checks,
+# first field wins), so they don't reduce to column operations over a batch.
+def standardize_record_tuple(record: Dict[str, Any]) -> Tuple[str, ...]:
+    """Standardize a data record into a tuple of values in STANDARD_HEADERS order."""
+    return project_row(standardize_record(record))
+
+def _key_digest(key: str) -> bytes:
+    """Hash a record key down to a fixed-size 16-byte digest."""
+    return hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
 
 # Function to generate a unique key for a record to detect duplicates
-def generate_record_key(record: Dict[str, Any]) -> str:
+def generate_record_key(record: Dict[str, Any]) -> bytes:
     """
     Generate a unique key for a record based on its identifying fields.
     This is used to detect duplicate records.
+
+    Keys are 16-byte digests, so they cost the same to store and compare
+    however long the identifying fields are.
     """
     # Use Item ID as the primary key if available
     if record.get("Item ID"):
-        return f"id:{record['Item ID']}"
+        return _key_digest(f"id:{record['Item ID']}")
 
     # Use SKU as a fallback
     if record.get("SKU"):
-        return f"sku:{record['SKU']}"
+        return _key_digest(f"sku:{record['SKU']}")
 
     # Use Item Name + Description as a last resort
     if record.get("Item Name") and record.get("Description"):
         name = record["Item Name"].strip().lower()
         desc = record["Description"].strip().lower()
-        return f"name_desc:{name}_{desc[:50]}"
+        return _key_digest(f"name_desc:{name}_{desc[:50]}")
 
     # If no good identifying fields, use a hash of all non-empty values
-    values = [str(v) for k, v in record.items() if v and k in STANDARD_HEADERS]
+    values = list(islice((str(v) for k, v in record.items() if v and k in _STANDARD_HEADERS_SET), 5))
     if values:
-        return f"hash:{'_'.join(values[:5])}"
+        return _key_digest(f"hash:{'_'.join(values)}")
 
-    # Last resort - return a random string (will not detect duplicates)
-    return f"unknown:{time.time()}"
+    # Last resort - return random bytes (will not detect duplicates)
+    return os.urandom(16)
 
 
+# Numeric part of a price string such as "$1,299.99"
+_PRICE_RE = re.compile(r'\$?([\d,]+\.?\d*)')
+
 # Function to extract price from various formats
 def extract_price(value: Any) -> str:
     """Extract a price value from various formats."""
-    if isinstance(value, (int, float)):
+    # Most prices are plain floats or ints, which the exact type checks catch
+    # without isinstance; bools and other subclasses still fall through to it
+    value_type = type(value)
+    if value_type is float or value_type is int or isinstance(value, (int, float)):
         return str(value)
 
+    # A missing price has no value rather than the string "None"
+    if value is None:
+        return ""
+
     if isinstance(value, str):
+        # Plain numbers like "12.99" are already in the right format
+        if value[:1].isdecimal() and value.replace('.', '', 1).isdecimal():
+            return value
+
         # Try to extract numeric value from string (e.g., "$10.99")
-        match = re.search(r'\$?([\d,]+\.?\d*)', value)
+        match = _PRICE_RE.search(value)
         if match:
             # Remove commas and convert to string
             return match.group(1).replace(',', '')
@@ -335,6 +480,49 @@ def extract_price(value: Any) -> str:
 # Progress callback type
 ProgressCallback = Callable[[int, int, str], None]
 
+# Glob patterns of the form "dir/prefix*.ext" (or "prefix*.ext"), which can be
+# matched with plain prefix and suffix checks
+_SIMPLE_PATTERN_RE = re.compile(r'^(?:([^*?\[]+)/)?([^*?\[/]*)\*(\.\w+)$')
+
+def iter_json_files(directory: str, prefix: str = '', suffix: str = '.json') -> Iterator[str]:
+    """
+    Lazily yield the files in a directory named <prefix>*<suffix>.
+
+    This is the os.scandir equivalent of glob.iglob(f"{directory}/{prefix}*{suffix}"):
+    the directory entries' cached file types are used instead of fnmatch, hidden
+    files are skipped unless the prefix asks for them, and a missing or
+    unreadable directory yields nothing.
+    """
+    min_length = len(prefix) + len(suffix)
+    try:
+        with os.scandir(directory or '.') as entries:
+            for entry in entries:
+                name = entry.name
+                if (name.startswith(prefix) and name.endswith(suffix) and len(name) >= min_length
+                        and (prefix or not name.startswith('.')) and entry.is_file()):
+                    yield entry.path if directory else name
+    except OSError:
+        return
+
+def find_json_files(pattern: str) -> List[str]:
+    """
+    Find the files matching a glob pattern.
+
+    Simple "dir/prefix*.json" patterns are matched straight from os.scandir
+    via iter_json_files; anything else goes through glob.glob.
+    """
+    match = _SIMPLE_PATTERN_RE.match(pattern)
+    if not match:
+        return glob.glob(pattern)
+
+    directory, prefix, suffix = match.groups()
+    return list(iter_json_files(directory or '', prefix, suffix))
+
+def read_json_file(file_path: str) -> Any:
+    """Read and parse a JSON file with the fastest available parser."""
+    with open(file_path, 'rb') as f:
+        return _json.loads(f.read())
+
 def extract_product_data(json_data: Dict[str, Any]) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
     """
     Extract product data from Home Depot JSON structure.
@@ -410,8 +598,8 @@ def debug_price_extraction(file_path: str) -> None:
     Debug function to print price information from a JSON file.
     """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        with open(file_path, 'rb') as f:
+            json_data = _json.loads(f.read())
 
             print(f"\nDEBUG - File: {file_path}")
 
@@ -458,14 +646,86 @@ def debug_price_extraction(file_path: str) -> None:
     except Exception as e:
         print(f"  Error debugging file: {str(e)}")
 
-def process_json_file(file_path: str, known_records: Optional[Dict[str, bool]] = None) -> Tuple[List[Dict[str, Any]], int, int, List[str]]:
+# Set STREAM_LARGE_FILES=1 to stream product files larger than STREAM_THRESHOLD
+# with ijson instead of parsing them whole. Streaming holds a fraction of the
+# memory of a full parse but takes longer, so it is off by default.
+STREAM_LARGE_FILES = ijson is not None and os.environ.get('STREAM_LARGE_FILES') == '1'
+STREAM_THRESHOLD = 512 * 1024
+
+# Product keys standardize_record reads, besides those mapped to a standard header
+_STREAMED_PRODUCT_FIELDS = _PROCESSED_FIELDS | {'item_id', 'model_number', 'store_sku', 'buybox_winner'}
+
+# ijson events that open and close a container
+_START_EVENTS = frozenset({'start_map', 'start_array'})
+_END_EVENTS = frozenset({'end_map', 'end_array'})
+
+def _build_value(events: Iterator[Tuple[str, str, Any]]) -> Any:
+    """Build the value that starts at the next event of an ijson event stream."""
+    builder = ijson.ObjectBuilder()
+    depth = 0
+    for _, event, value in events:
+        builder.event(event, value)
+        if event in _START_EVENTS:
+            depth += 1
+        elif event in _END_EVENTS:
+            depth -= 1
+        if depth == 0:
+            return builder.value
+    raise ValueError("Incomplete JSON value")
+
+def _stream_product_file(f: BinaryIO) -> Optional[Dict[str, Any]]:
+    """
+    Stream the parts of a Home Depot product file that standardization uses.
+
+    The file is read in a single pass over its ijson events, which stops as
+    soon as both the product and the top-level buybox_winner have been seen.
+    Only the product fields standardize_record reads are built into objects;
+    images, reviews and other unused sub-trees are skipped event by event.
+
+    Returns:
+        A minimal {'product': ..., 'buybox_winner': ...} structure, or None if
+        the file has no product object or can't be streamed, in which case the
+        caller should parse it normally
+    """
+    product = {}
+    json_data = {'product': product}
+    product_done = False
+    try:
+        events = ijson.parse(f, use_float=True)
+        for prefix, event, value in events:
+            if prefix == 'product':
+                if event == 'map_key':
+                    if value in _STREAMED_PRODUCT_FIELDS or map_field_name(value) in _STANDARD_HEADERS_SET:
+                        product[value] = _build_value(events)
+                elif event == 'end_map':
+                    product_done = True
+                    if 'buybox_winner' in json_data:
+                        break
+            elif prefix == '' and event == 'map_key':
+                if value == 'buybox_winner':
+                    json_data['buybox_winner'] = _build_value(events)
+                    if product_done:
+                        break
+                elif value == 'search_results':
+                    # Search results pages have no product to stream
+                    return None
+    except Exception:
+        # Malformed input gets its error message from the regular parser
+        return None
+
+    return json_data if product else None
+
+def process_json_file(file_path: str, known_records: Optional[Set[bytes]] = None,
+                      record_keys: Optional[List[bytes]] = None) -> Tuple[List[Dict[str, Any]], int, int, List[str]]:
     """
     Process a single JSON file and extract standardized data, skipping duplicates.
     Handles Home Depot specific JSON structure.
 
     Args:
         file_path: Path to the JSON file
-        known_records: Dictionary of already processed record keys
+        known_records: Set of already processed record keys
+        record_keys: Optional list to which the key of each returned record is
+            appended, in the same order as the records
 
     Returns:
         Tuple containing:
@@ -474,6 +734,24 @@ def process_json_file(file_path: str, known_records: Optional[Dict[str, bool]] =
         - Number of duplicate records skipped
         - List of errors
     """
+    # Each worker process reads its own files, so the reads already overlap
+    # across the pool; reading ahead in the parent would only add an IPC copy
+    # per file.
+    try:
+        with open(file_path, 'rb') as f:
+            # Stream just the product out of large files, when enabled
+            json_data = None
+            if STREAM_LARGE_FILES and os.fstat(f.fileno()).st_size > STREAM_THRESHOLD:
+                json_data = _stream_product_file(f)
+                if json_data is None:
+                    f.seek(0)
+
+            if json_data is None:
+                # Read the raw bytes; the parser decodes them itself
+                file_content = f.read()
+    except Exception as e:
+        return [], 0, 0, [f"Error reading {file_path}: {str(e)}"]
+
     standardized_data = []
     record_count = 0
     duplicate_count = 0
@@ -481,38 +759,74 @@ def process_json_file(file_path: str, known_records: Optional[Dict[str, bool]] =
 
     # Initialize known_records if not provided
     if known_records is None:
-        known_records = {}
+        known_records = set()
 
     # Log file processing
     logger.info(f"Processing file: {os.path.basename(file_path)}")
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
+        if json_data is None:
+            # Log file size and first 100 characters
+            if DEBUG_ENABLED:
+                logger.debug(f"  File size: {len(file_content)} bytes")
+                preview_text = file_content[:100].decode('utf-8', 'replace').replace('\n', ' ')
+                logger.debug(f"  File preview: {preview_text}...")
+
+            # Parse JSON
+            json_data = _json.loads(file_content)
+
+        # DIRECT APPROACH FOR HOME DEPOT FILES
+        # Check if this is a Home Depot product file with the expected structure
+        if 'product' in json_data and isinstance(json_data['product'], dict):
+            product = json_data['product']
+
+            # Price the product from the top-level buybox_winner if it exists
+            buybox_winner = json_data.get('buybox_winner')
+            if not isinstance(buybox_winner, dict):
+                buybox_winner = None
+
+            # Standardize the record
             try:
-                # Read the file content
-                file_content = f.read()
-
-                # Log file size and first 100 characters
-                logger.info(f"  File size: {len(file_content)} bytes")
-                preview_text = file_content[:100].replace('\n', ' ')
-                logger.info(f"  File preview: {preview_text}...")
+                standardized = standardize_record(product, buybox_winner)
 
-                # Parse JSON
-                json_data = json.loads(file_content)
+                # Generate a unique key for duplicate detection
+                record_key = generate_record_key(standardized)
 
-                # DIRECT APPROACH FOR HOME DEPOT FILES
-                # Check if this is a Home Depot product file with the expected structure
-                if 'product' in json_data and isinstance(json_data['product'], dict):
-                    # Create a product object with the price information
-                    product = json_data['product'].copy()
-
-                    # Add buybox_winner if it exists at the top level
-                    if 'buybox_winner' in json_data and isinstance(json_data['buybox_winner'], dict):
-                        product['buybox_winner'] = json_data['buybox_winner']
+                # Check if this record has already been processed
+                if record_key in known_records:
+                    duplicate_count += 1
+                else:
+                    # Mark this record as processed
+                    known_records.add(record_key)
+
+                    # Add to our data
+                    standardized_data.append(standardized)
+                    if record_keys is not None:
+                        record_keys.append(record_key)
+                    record_count += 1
+            except Exception as e:
+                errors.append(f"Error standardizing record in {file_path}: {str(e)}")
+
+        # FALLBACK APPROACH FOR OTHER FILES
+        else:
+            # Extract product data based on file structure
+            product_data = extract_product_data(json_data)
+
+            if product_data is None:
+                # Fall back to treating the whole JSON as the product data
+                items = [json_data] if isinstance(json_data, dict) else json_data if isinstance(json_data, list) else []
+            elif isinstance(product_data, list):
+                # Multiple products (search results)
+                items = product_data
+            else:
+                # Single product
+                items = [product_data]
 
-                    # Standardize the record
+            for item in items:
+                if isinstance(item, dict):
                     try:
-                        standardized = standardize_record(product)
+                        # Standardize the record
+                        standardized = standardize_record(item)
 
                         # Generate a unique key for duplicate detection
                         record_key = generate_record_key(standardized)
@@ -520,62 +834,60 @@ def process_json_file(file_path: str, known_records: Optional[Dict[str, bool]] =
                         # Check if this record has already been processed
                         if record_key in known_records:
                             duplicate_count += 1
-                        else:
-                            # Mark this record as processed
-                            known_records[record_key] = True
+                            continue  # Skip this duplicate record
 
-                            # Add to our data
-                            standardized_data.append(standardized)
-                            record_count += 1
+                        # Mark this record as processed
+                        known_records.add(record_key)
+
+                        # Add to our data
+                        standardized_data.append(standardized)
+                        if record_keys is not None:
+                            record_keys.append(record_key)
+                        record_count += 1
                     except Exception as e:
                         errors.append(f"Error standardizing record in {file_path}: {str(e)}")
-
-                # FALLBACK APPROACH FOR OTHER FILES
                 else:
-                    # Extract product data based on file structure
-                    product_data = extract_product_data(json_data)
-
-                    if product_data is None:
-                        # Fall back to treating the whole JSON as the product data
-                        items = [json_data] if isinstance(json_data, dict) else json_data if isinstance(json_data, list) else []
-                    elif isinstance(product_data, list):
-                        # Multiple products (search results)
-                        items = product_data
-                    else:
-                        # Single product
-                        items = [product_data]
-
-                    for item in items:
-                        if isinstance(item, dict):
-                            try:
-                                # Standardize the record
-                                standardized = standardize_record(item)
-
-                                # Generate a unique key for duplicate detection
-                                record_key = generate_record_key(standardized)
-
-                                # Check if this record has already been processed
-                                if record_key in known_records:
-                                    duplicate_count += 1
-                                    continue  # Skip this duplicate record
-
-                                # Mark this record as processed
-                                known_records[record_key] = True
-
-                                # Add to our data
-                                standardized_data.append(standardized)
-                                record_count += 1
-                            except Exception as e:
-                                errors.append(f"Error standardizing record in {file_path}: {str(e)}")
-                        else:
-                            errors.append(f"Skipped non-dictionary item in {file_path}")
-            except json.JSONDecodeError as e:
-                errors.append(f"Error parsing {file_path}: {str(e)}")
+                    errors.append(f"Skipped non-dictionary item in {file_path}")
+    except ValueError as e:
+        # json.JSONDecodeError, orjson.JSONDecodeError and ujson's
+        # decode error are all ValueError subclasses
+        errors.append(f"Error parsing {file_path}: {str(e)}")
     except Exception as e:
         errors.append(f"Error reading {file_path}: {str(e)}")
 
     return standardized_data, record_count, duplicate_count, errors
 
+def process_json_file_rows(file_path: str) -> Tuple[List[Tuple[bytes, Tuple[str, ...]]], int, int, List[str]]:
+    """
+    Process a single JSON file like process_json_file, returning CSV-ready rows.
+
+    Each record comes back as a (duplicate detection key, row tuple) pair, with
+    the row's values in STANDARD_HEADERS order.
+    """
+    # Reuse the keys process_json_file computed for its own duplicate check
+    record_keys: List[bytes] = []
+    data, record_count, duplicate_count, errors = process_json_file(file_path, record_keys=record_keys)
+    rows = list(zip(record_keys, map(project_row, data)))
+    return rows, record_count, duplicate_count, errors
+
+def _write_rows(write_queue: queue.Queue, writer: Any, write_errors: List[Exception]) -> None:
+    """
+    Write each batch of rows taken from write_queue until it yields None.
+
+    If a write fails the error is recorded in write_errors and the remaining
+    batches are drained without writing, so the producer never blocks.
+    """
+    while True:
+        rows = write_queue.get()
+        if rows is None:
+            return
+        if write_errors:
+            continue
+        try:
+            writer.writerows(rows)
+        except Exception as e:
+            write_errors.append(e)
+
 def combine_json_to_csv(input_path: Union[str, List[str]], output_file: str,
                        progress_callback: Optional[ProgressCallback] = None,
                        max_workers: int = 4,
@@ -589,8 +901,9 @@ def combine_json_to_csv(input_path: Union[str, List[str]], output_file: str,
         input_path: Path pattern for JSON files (e.g., "data/*.json") or a list of file paths
         output_file: Path for the output CSV file
         progress_callback: Optional callback function to report progress
-        max_workers: Maximum number of worker threads for parallel processing
-        batch_size: Number of records to write in each batch
+        max_workers: Maximum number of worker processes for parallel processing
+        batch_size: Unused; rows are written as each file completes. Kept for
+            backward compatibility
         skip_duplicates: Whether to skip duplicate records (default: True)
 
     Returns:
@@ -609,7 +922,7 @@ def combine_json_to_csv(input_path: Union[str, List[str]], output_file: str,
     # Get all JSON files - either from a pattern or a list
     if isinstance(input_path, str):
         # Input is a glob pattern
-        json_files = glob.glob(input_path)
+        json_files = find_json_files(input_path)
     else:
         # Input is already a list of files
         json_files = input_path
@@ -628,32 +941,51 @@ def combine_json_to_csv(input_path: Union[str, List[str]], output_file: str,
     all_errors: List[str] = []
     processed_count = 0
 
-    # Dictionary to track unique records (for duplicate detection)
-    known_records = {} if skip_duplicates else None
-
-    # Use a thread pool to process files in parallel
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all file processing tasks with the known_records dictionary
-        future_to_file = {executor.submit(process_json_file, file, known_records): file for file in json_files}
-
-        # Create CSV file and writer with Excel-compatible settings
-        with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-            # Use our standard headers
-            writer = csv.DictWriter(csvfile, fieldnames=STANDARD_HEADERS)
-            writer.writeheader()
+    # Set of unique record keys across files (for duplicate detection).
+    # Worker processes don't share state, so each one only skips duplicates
+    # within its own file and the rest are caught here as results come back.
+    known_records = set()
+
+    # Parsing and standardizing is CPU-bound, so spread files over processes,
+    # sending them in chunks to cut the per-file IPC overhead
+    chunksize = max(1, total_files // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(process_json_file_rows, json_files, chunksize=chunksize)
+
+        # Create CSV file and writer with Excel-compatible settings. The BOM
+        # Excel needs is written once so the rest can use the plain utf-8 codec.
+        with open(output_file, 'wb') as raw:
+            raw.write(codecs.BOM_UTF8)
+        with open(output_file, 'a', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
+            # Use our standard headers; rows arrive as tuples in header order
+            writer = csv.writer(csvfile)
+            writer.writerow(STANDARD_HEADERS)
 
             # Write a blank row to ensure Excel recognizes the headers
-            blank_row = {header: '' for header in STANDARD_HEADERS}
-            writer.writerow(blank_row)
+            writer.writerow([''] * len(STANDARD_HEADERS))
 
-            # Temporary storage for batch processing
-            temp_data = []
+            # Rows are written on a separate thread so collecting results from
+            # the workers doesn't wait on disk writes
+            write_queue = queue.Queue(maxsize=max_workers * 2)
+            write_errors: List[Exception] = []
+            writer_thread = threading.Thread(target=_write_rows, args=(write_queue, writer, write_errors), daemon=True)
+            writer_thread.start()
 
-            # Process completed tasks
-            for i, future in enumerate(as_completed(future_to_file)):
-                file = future_to_file[future]
-                try:
-                    data, record_count, duplicate_count, errors = future.result()
+            # Process results in file order
+            try:
+                for file, (rows, record_count, duplicate_count, errors) in zip(json_files, results):
+                    # Skip records already seen in an earlier file
+                    if skip_duplicates:
+                        data = []
+                        for record_key, row in rows:
+                            if record_key in known_records:
+                                duplicate_count += 1
+                            else:
+                                known_records.add(record_key)
+                                data.append(row)
+                        record_count -= len(rows) - len(data)
+                    else:
+                        data = [row for _, row in rows]
 
                     # Update statistics
                     processed_count += 1
@@ -665,32 +997,29 @@ def combine_json_to_csv(input_path: Union[str, List[str]], output_file: str,
                         stats["files_with_errors"] += 1
                         all_errors.extend(errors)
 
-                    # Store data for batch processing
-                    temp_data.extend(data)
+                    # Hand the file's rows to the writer thread
+                    if data:
+                        write_queue.put(data)
 
                     # Report progress with duplicate info
                     if progress_callback:
                         message = f"Processed {file} ({record_count} records, {duplicate_count} duplicates skipped)"
                         progress_callback(processed_count, total_files, message)
 
-                    # Write in batches to avoid memory issues
-                    if len(temp_data) >= batch_size:
-                        # Write batch
-                        for item in temp_data:
-                            writer.writerow(item)
-
-                        # Clear temporary data
-                        temp_data = []
-
-                except Exception as e:
-                    logger.error(f"Error processing {file}: {str(e)}")
-                    stats["errors"].append(f"Error processing {file}: {str(e)}")
-                    stats["files_with_errors"] += 1
-
-            # Write any remaining data
-            if temp_data:
-                for item in temp_data:
-                    writer.writerow(item)
+            except Exception as e:
+                # A failed worker process (e.g. one that crashed) ends the run
+                # with the results collected so far
+                logger.error(f"Error processing files: {str(e)}")
+                stats["errors"].append(f"Error processing files: {str(e)}")
+                stats["files_with_errors"] += 1
+            finally:
+                # Let the writer finish the queued rows before the file closes
+                write_queue.put(None)
+                writer_thread.join()
+
+            if write_errors:
+                logger.error(f"Error writing {output_file}: {str(write_errors[0])}")
+                stats["errors"].append(f"Error writing {output_file}: {str(write_errors[0])}")
 
     # Update statistics
     stats["elapsed_time"] = time.time() - start_time
@@ -716,8 +1045,8 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Convert JSON files to CSV with standardized headers')
     parser.add_argument('--input', '-i', default='data/*.json', help='Input pattern for JSON files (e.g., "data/*.json")')
     parser.add_argument('--output', '-o', default='output.csv', help='Output CSV file name')
-    parser.add_argument('--workers', '-w', type=int, default=4, help='Number of worker threads')
-    parser.add_argument('--batch-size', '-b', type=int, default=10000, help='Batch size for processing')
+    parser.add_argument('--workers', '-w', type=int, default=4, help='Number of worker processes')
+    parser.add_argument('--batch-size', '-b', type=int, default=10000, help='Unused; kept for backward compatibility')
     parser.add_argument('--allow-duplicates', '-d', action='store_true', help='Allow duplicate records (default: skip duplicates)')
     parser.add_argument('--debug', action='store_true', help='Run in debug mode to diagnose price extraction')
 
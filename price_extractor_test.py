@@ -1,17 +1,26 @@
 #!/usr/bin/env python3
-import json
-import glob
 import csv
 import re
+from itertools import islice
+from json_to_csv_converter import iter_json_files, read_json_file
+
+# Numeric part of a price string such as "$1,299.99"
+_PRICE_RE = re.compile(r'\$?([\d,]+\.?\d*)')
+
+# Anything that looks like a price
+_PRICE_DETECT_RE = re.compile(r'\$?\d+\.?\d*')
 
 def extract_price(value):
     """Extract a price value from various formats."""
-    if isinstance(value, (int, float)):
+    # Most prices are plain floats or ints, which the exact type checks catch
+    # without isinstance; bools and other subclasses still fall through to it
+    value_type = type(value)
+    if value_type is float or value_type is int or isinstance(value, (int, float)):
         return str(value)
 
     if isinstance(value, str):
         # Try to extract numeric value from string (e.g., "$10.99")
-        match = re.search(r'\$?([\d,]+\.?\d*)', value)
+        match = _PRICE_RE.search(value)
         if match:
             # Remove commas and convert to string
             return match.group(1).replace(',', '')
@@ -19,72 +28,116 @@ def extract_price(value):
     # Return as is if we can't extract a price
     return str(value)
 
+def looks_like_price(value):
+    """Check whether a string contains something that looks like a price."""
+    # Prices almost always start with a digit or "$" and a digit, which is
+    # enough for the pattern to match; only other strings need the regex
+    first = value[:1]
+    if first.isdecimal() or (first == '$' and value[1:2].isdecimal()):
+        return True
+    return _PRICE_DETECT_RE.search(value) is not None
+
+def _child_items(node, path):
+    """
+    Yield (key, value, path) for each child of a dict or list.
+
+    Paths are linked (parent path, key or index, is_index) tuples, so a child's
+    path costs one small tuple no matter how deep it is; the text form is only
+    built for the paths that are reported.
+    """
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield key, value, (path, key, False)
+    elif isinstance(node, list):
+        for i, item in enumerate(node):
+            yield None, item, (path, i, True)
+
+def _format_path(path, prefix):
+    """Render a linked path as text like "product.variants[0].price"."""
+    segments = []
+    while path is not None:
+        path, segment, is_index = path
+        segments.append((segment, is_index))
+
+    text = prefix
+    for segment, is_index in reversed(segments):
+        if is_index:
+            text = f"{text}[{segment}]"
+        else:
+            text = f"{text}.{segment}" if text else segment
+    return text
+
 def find_price_in_json(json_data, path=""):
-    """Recursively search for price fields in JSON data."""
+    """Search for price fields in JSON data, depth first in document order."""
     prices = []
-    
-    if isinstance(json_data, dict):
-        for key, value in json_data.items():
-            current_path = f"{path}.{key}" if path else key
-            
+
+    # Walk the tree with an explicit stack of child iterators rather than
+    # recursion, descending into each container as it is reached
+    stack = [_child_items(json_data, None)]
+    while stack:
+        for key, value, current_path in stack[-1]:
             # Check if this is a price field
-            if key == "price" and (isinstance(value, (int, float)) or 
-                                  (isinstance(value, str) and re.search(r'\$?\d+\.?\d*', value))):
-                prices.append((current_path, value))
-            
-            # Recursively search nested dictionaries and lists
+            if key == "price" and (isinstance(value, (int, float)) or
+                                  (isinstance(value, str) and looks_like_price(value))):
+                prices.append((_format_path(current_path, path), value))
+
+            # Search nested dictionaries and lists before the next sibling
             if isinstance(value, (dict, list)):
-                prices.extend(find_price_in_json(value, current_path))
-    
-    elif isinstance(json_data, list):
-        for i, item in enumerate(json_data):
-            current_path = f"{path}[{i}]"
-            if isinstance(item, (dict, list)):
-                prices.extend(find_price_in_json(item, current_path))
-    
+                stack.append(_child_items(value, current_path))
+                break
+        else:
+            stack.pop()
+
     return prices
 
+def price_rows(product_files):
+    """Yield a CSV row for every price found in each product file."""
+    for file_path in product_files:
+        try:
+            json_data = read_json_file(file_path)
+
+            # Get product info
+            product_id = "Unknown"
+            product_name = "Unknown"
+
+            if 'product' in json_data and isinstance(json_data['product'], dict):
+                product = json_data['product']
+                # Only look up the model number when there's no item_id
+                product_id = product.get('item_id')
+                if product_id is None:
+                    product_id = product.get('model_number', "Unknown")
+                product_name = product.get('title', "Unknown")
+
+            # Find all price fields
+            prices = find_price_in_json(json_data)
+
+            if prices:
+                for price_path, price_value in prices:
+                    yield (
+                        file_path,
+                        product_id,
+                        product_name,
+                        price_path,
+                        extract_price(price_value)
+                    )
+            else:
+                yield (file_path, product_id, product_name, "No price found", "")
+
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}")
+
 def main():
-    # Find all Home Depot product files
-    product_files = glob.glob('uploads/homedepot_raw_product_*.json')
+    # Find the Home Depot product files; only the first 10 are read, so the
+    # directory listing is consumed lazily
+    product_files = iter_json_files('uploads', 'homedepot_raw_product_')
     
     # Create CSV file for results
-    with open('price_analysis.csv', 'w', newline='', encoding='utf-8-sig') as csvfile:
+    with open('price_analysis.csv', 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(['File', 'Product ID', 'Product Name', 'Price Path', 'Price Value'])
         
-        # Process each file
-        for file_path in product_files[:10]:  # Process first 10 files
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                    
-                    # Get product info
-                    product_id = "Unknown"
-                    product_name = "Unknown"
-                    
-                    if 'product' in json_data and isinstance(json_data['product'], dict):
-                        product = json_data['product']
-                        product_id = product.get('item_id', product.get('model_number', "Unknown"))
-                        product_name = product.get('title', "Unknown")
-                    
-                    # Find all price fields
-                    prices = find_price_in_json(json_data)
-                    
-                    if prices:
-                        for price_path, price_value in prices:
-                            writer.writerow([
-                                file_path, 
-                                product_id, 
-                                product_name, 
-                                price_path, 
-                                extract_price(price_value)
-                            ])
-                    else:
-                        writer.writerow([file_path, product_id, product_name, "No price found", ""])
-                        
-            except Exception as e:
-                print(f"Error processing {file_path}: {str(e)}")
+        # Write the rows for the first 10 files in one call
+        writer.writerows(price_rows(islice(product_files, 10)))
     
     print(f"Price analysis complete. Results saved to price_analysis.csv")
 
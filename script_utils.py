@@ -0,0 +1,36 @@
+"""
+Helpers shared by the standalone test scripts.
+"""
+import contextlib
+import gc
+from json_to_csv_converter import STANDARD_HEADERS
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Pause the cyclic garbage collector while a batch of files is parsed.
+
+    Parsing only allocates acyclic containers, so the collector's passes over
+    the growing heap would find nothing to free. It is re-enabled, and run
+    once, when the block exits.
+    """
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+        gc.collect()
+
+def csv_escape(value):
+    """Quote a CSV field the way csv.writer's default (excel) dialect does."""
+    if ',' in value or '"' in value or '\n' in value or '\r' in value:
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+def write_record_csv(output_file, standardized):
+    """Write a CSV file holding the standard headers and one standardized record."""
+    with open(output_file, 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
+        # A single row doesn't need a csv writer; the encoding
+        # still adds the BOM Excel expects
+        csvfile.write(','.join(map(csv_escape, STANDARD_HEADERS)) + '\r\n')
+        csvfile.write(','.join(csv_escape(standardized[header]) for header in STANDARD_HEADERS) + '\r\n')
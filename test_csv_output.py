@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
-import json
 import csv
-from json_to_csv_converter import standardize_record, STANDARD_HEADERS
+from json_to_csv_converter import standardize_record, read_json_file
+from script_utils import write_record_csv
 
 def test_csv_output():
     """Test direct processing of a test file and writing to CSV."""
@@ -9,8 +9,7 @@ def test_csv_output():
     
     try:
         # Load the test file
-        with open('test_product.json', 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = read_json_file('test_product.json')
         
         # Check if this is a product file
         if 'product' in json_data and isinstance(json_data['product'], dict):
@@ -20,10 +19,7 @@ def test_csv_output():
             standardized = standardize_record(product)
             
             # Write to CSV
-            with open('test_output.csv', 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=STANDARD_HEADERS)
-                writer.writeheader()
-                writer.writerow(standardized)
+            write_record_csv('test_output.csv', standardized)
             
             print(f"CSV file created: test_output.csv")
             
@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
-import json
 import os
+from json_to_csv_converter import read_json_file
+
+# Fields that may hold a description, in the order they are reported
+DESC_FIELDS = ['description', 'snippet', 'details', 'long_description', 'short_description', 'summary']
+_DESC_FIELD_ORDER = {field: i for i, field in enumerate(DESC_FIELDS)}
+_DESC_FIELD_SET = frozenset(DESC_FIELDS)
+
+def present_desc_fields(data):
+    """Return the description fields present in a dictionary, in report order."""
+    # Intersecting with the dict's keys happens in C; most dicts have none
+    return sorted(_DESC_FIELD_SET.intersection(data), key=_DESC_FIELD_ORDER.__getitem__)
 
 def find_description_fields(file_path):
     """Find all possible description fields in a Home Depot search results file."""
     print(f"Analyzing file: {file_path}")
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = read_json_file(file_path)
 
         if 'search_results' in json_data:
             search_results = json_data['search_results']
@@ -32,9 +41,8 @@ def find_description_fields(file_path):
                     print(f"  Keys at top level: {list(product.keys())}")
 
                     # Check for description fields at top level
-                    for field in ['description', 'snippet', 'details', 'long_description', 'short_description', 'summary']:
-                        if field in product:
-                            print(f"  Found {field} at top level: {str(product[field])[:100]}...")
+                    for field in present_desc_fields(product):
+                        print(f"  Found {field} at top level: {str(product[field])[:100]}...")
 
                     # Check for product data
                     if 'product' in product and isinstance(product['product'], dict):
@@ -43,9 +51,8 @@ def find_description_fields(file_path):
                         print(f"  Keys in product: {list(product_data.keys())}")
 
                         # Check for description fields in product
-                        for field in ['description', 'snippet', 'details', 'long_description', 'short_description', 'summary']:
-                            if field in product_data:
-                                print(f"  Found {field} in product: {str(product_data[field])[:100]}...")
+                        for field in present_desc_fields(product_data):
+                            print(f"  Found {field} in product: {str(product_data[field])[:100]}...")
 
                     # Check for content_spec
                     if 'content_spec' in product and isinstance(product['content_spec'], dict):
@@ -1,6 +1,5 @@
 #!/usr/bin/env python3
-import json
-from json_to_csv_converter import standardize_record
+from json_to_csv_converter import standardize_record, read_json_file
 
 def test_direct_processing():
     """Test direct processing of a test file."""
@@ -8,8 +7,7 @@ def test_direct_processing():
     
     try:
         # Load the test file
-        with open('test_product.json', 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = read_json_file('test_product.json')
         
         print(f"Loaded JSON data: {json_data}")
         
